@@ -1,14 +1,37 @@
 import os
-import requests
 import time
+import asyncio
+import aiohttp
+import ciso8601
+import numpy as np
+import orjson
+from aiolimiter import AsyncLimiter
 from datetime import datetime, timedelta
-import warnings
 import pytz
-import threading
 import json
+import logging
 
-# Suppress SSL warnings
-warnings.filterwarnings('ignore', message='Unverified HTTPS request')
+try:
+    import redis.asyncio as redis
+except ImportError:  # Redis caching is optional
+    redis = None
+
+# UK timezone used for log and report times, resolved once
+UK_TZ = pytz.timezone('Europe/London')
+
+class UKFormatter(logging.Formatter):
+    """Stamp log records in UK time, like the old debug_log did"""
+    def formatTime(self, record, datefmt=None):
+        return datetime.fromtimestamp(record.created, UK_TZ).strftime(datefmt or "%Y-%m-%d %H:%M:%S %Z")
+
+# Logging: UK timestamps, level overridable with LOG_LEVEL (e.g. DEBUG for request traces)
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(UKFormatter("[%(levelname)s][%(asctime)s] %(message)s"))
+log = logging.getLogger("scanner")
+log.addHandler(_log_handler)
+_log_level = os.environ.get("LOG_LEVEL", "INFO").upper()
+log.setLevel(_log_level if isinstance(logging.getLevelName(_log_level), int) else logging.INFO)
+log.propagate = False
 
 # Configuration from environment variables
 RAPIDAPI_KEY = os.environ.get("RAPIDAPI_KEY")
@@ -27,6 +50,15 @@ TOP_LEAGUES = {
     "UEL": 2000         # Europa League
 }
 
+# football-data.org accepts a comma-separated competitions filter on /matches
+COMPETITION_FILTER = ",".join(str(league_id) for league_id in TOP_LEAGUES.values())
+
+# Sort rank of each competition, most important first
+PRIORITY_RANK = {league_id: rank for rank, league_id in enumerate([2021, 2014, 2002, 2019, 2015, 2001, 2000])}
+
+# Short league name for each competition ID
+ID_TO_NAME = {league_id: league_name for league_name, league_id in TOP_LEAGUES.items()}
+
 HEADERS = {
     "X-RapidAPI-Key": RAPIDAPI_KEY,
     "X-RapidAPI-Host": "api-football-v1.p.rapidapi.com"
@@ -34,176 +66,337 @@ HEADERS = {
 
 FOOTBALL_DATA_HEADERS = {"X-Auth-Token": FOOTBALL_DATA_TOKEN}
 
-# Rate limiting variables
-last_request_time = 0
-request_lock = threading.Lock()
-MIN_REQUEST_INTERVAL = 8.0  # seconds (safer for free tier)
+# Rate limiting: one leaky bucket per provider. AsyncLimiter(n, period) lets n
+# requests through at once, so the quota-bound APIs get a bucket of one that
+# spaces calls 7.5s apart (8/minute, under football-data's 10/minute free tier)
+FOOTBALL_DATA_LIMITER = AsyncLimiter(1, 60 / 8)
+RAPIDAPI_LIMITER = AsyncLimiter(1, 60 / 8)
+TELEGRAM_LIMITER = AsyncLimiter(30, 1)  # bot API global limit
+MAX_RETRIES = 3
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Errors a single API call can raise: network failures, timeouts and malformed payloads
+REQUEST_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, ValueError, KeyError)
+
+# Keep pooled connections alive across limiter waits so each call skips the TLS handshake
+KEEPALIVE_TIMEOUT = 75  # seconds
+
+# Optional Redis response cache shared between runs (disabled when REDIS_URL is unset)
+REDIS_URL = os.environ.get("REDIS_URL")
+# Short socket timeouts so an unreachable cache falls back to the APIs quickly
+REDIS = (redis.Redis.from_url(REDIS_URL, socket_connect_timeout=2, socket_timeout=2)
+         if redis and REDIS_URL else None)
+TEAM_HISTORY_TTL = 6 * 60 * 60  # team form changes slowly
+FIXTURES_TTL = 10 * 60  # fixtures within 2 days can still be rescheduled
+FIXTURES_FAR_TTL = 24 * 60 * 60
+CACHE_RETENTION = 7 * 24 * 60 * 60  # expired entries are kept this long as a stale fallback
+
+# Team history lookups for this run, keyed by (team_id, is_home, opponent_id)
+TEAM_HISTORY_CACHE = {}
+# Raw football-data match lists for this run, keyed by team_id
+TEAM_MATCHES_CACHE = {}
+# Fixtures from the upcoming date-range listing, keyed by UTC match date
+FIXTURES_BY_DATE = {}
+
+# Telegram rejects messages over 4096 characters; leave headroom for HTML entities
+TELEGRAM_MESSAGE_LIMIT = 3800
 
 # File to store predictions
 PREDICTIONS_FILE = "predictions.json"
 
-def rate_limited_request():
-    """Ensure we don't exceed API rate limits"""
-    global last_request_time
-    with request_lock:
-        current_time = time.time()
-        elapsed = current_time - last_request_time
-        if elapsed < MIN_REQUEST_INTERVAL:
-            time.sleep(MIN_REQUEST_INTERVAL - elapsed)
-        last_request_time = time.time()
-
-def debug_log(message):
-    timestamp = datetime.now(pytz.timezone('Europe/London')).strftime("%Y-%m-%d %H:%M:%S %Z")
-    print(f"[DEBUG][{timestamp}] {message}")
-
-def send_telegram(message):
+async def fetch_json(session, url, limiter, headers=None, params=None, timeout=15, ssl=None, data=None,
+                     retry_statuses=RETRY_STATUSES, retry_errors=True):
+    """GET a JSON payload within the provider's rate limit, retrying transient errors.
+
+    Passing a request body in data sends a POST instead. Only responses in
+    retry_statuses are retried, and timeouts/dropped connections only when
+    retry_errors is set; non-idempotent calls should narrow both.
+    Returns a (status, data) tuple; data is None unless the status is 200.
+    Raises one of REQUEST_ERRORS if the request cannot be completed.
+    """
+    # Like requests, leave out headers whose value is unset (e.g. a missing API key)
+    if headers:
+        headers = {name: value for name, value in headers.items() if value is not None}
+
+    for attempt in range(MAX_RETRIES + 1):
+        retry_after = ''
+        try:
+            async with limiter:
+                async with session.request("GET" if data is None else "POST", url,
+                                           headers=headers, params=params, data=data, ssl=ssl,
+                                           timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                    if response.status == 200:
+                        return response.status, orjson.loads(await response.read())
+                    if response.status not in retry_statuses or attempt == MAX_RETRIES:
+                        return response.status, None
+                    reason = f"HTTP {response.status}"
+                    retry_after = response.headers.get('Retry-After', '')
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            if not retry_errors or attempt == MAX_RETRIES:
+                raise
+            reason = repr(e)
+        delay = int(retry_after) if retry_after.isdigit() else 2 ** (attempt + 1)
+        log.warning("%s from %s. Retrying in %s seconds", reason, url, delay)
+        await asyncio.sleep(delay)
+
+async def send_telegram(session, message):
     """Send message to Telegram with proper error handling"""
     url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
     payload = {"chat_id": TELEGRAM_CHAT_ID, "text": message, "parse_mode": "HTML"}
     try:
-        response = requests.post(url, json=payload, verify=False, timeout=10)
-        debug_log(f"Telegram response: {response.status_code}")
-        return response.json()
-    except Exception as e:
-        debug_log(f"Telegram send error: {str(e)[:100]}")
+        # sendMessage is not idempotent: only a 429 (flood control, nothing delivered)
+        # is retried after Retry-After; 5xx, timeouts and dropped connections are not
+        status, data = await fetch_json(session, url, TELEGRAM_LIMITER,
+                                        headers={"Content-Type": "application/json"},
+                                        timeout=10, ssl=False, data=orjson.dumps(payload),
+                                        retry_statuses={429}, retry_errors=False)
+        log.debug("Telegram response: %s", status)
+        if status != 200:
+            log.error("Telegram send failed: HTTP %s", status)
+        return data
+    except REQUEST_ERRORS as e:
+        log.error("Telegram send error: %.100s", e)
+        return None
+
+async def cache_get(key, max_age=None):
+    """Return the value cached in Redis under key, or None on a miss
+
+    Entries older than max_age seconds count as a miss; with no max_age any
+    retained entry is returned, which callers use as a stale fallback.
+    """
+    if REDIS is None:
+        return None
+    try:
+        cached = await REDIS.get(key)
+    except redis.RedisError as e:
+        log.warning("Redis read failed for %s: %s", key, e)
+        return None
+    if cached is None:
         return None
+    try:
+        entry = orjson.loads(cached)
+        fetched_at, value = entry['fetched_at'], entry['data']
+    except (orjson.JSONDecodeError, KeyError, TypeError):
+        # A corrupt or foreign entry is treated as a miss and overwritten on the next write
+        log.warning("Ignoring malformed cache entry for %s", key)
+        return None
+    if max_age is not None and time.time() - fetched_at > max_age:
+        return None
+    return value
+
+async def cache_set(key, value):
+    """Cache a JSON-serialisable value in Redis, stamped with its fetch time"""
+    if REDIS is None:
+        return
+    try:
+        await REDIS.setex(key, CACHE_RETENTION, orjson.dumps({"fetched_at": time.time(), "data": value}))
+    except redis.RedisError as e:
+        log.warning("Redis write failed for %s: %s", key, e)
+
+def fixtures_ttl(date):
+    """Cache lifetime for a date's fixtures: short while kick-off times can still move"""
+    days_ahead = (datetime.strptime(date, "%Y-%m-%d").date() - datetime.now(UK_TZ).date()).days
+    return FIXTURES_FAR_TTL if days_ahead > 2 else FIXTURES_TTL
+
+async def get_fixtures(session, date):
+    """Get TOP league fixtures for a date
 
-def get_fixtures(date):
-    """Get fixtures from football-data.org for TOP leagues only with rate limiting"""
+    Dates covered by get_upcoming_match_dates' range listing are answered from
+    FIXTURES_BY_DATE, which is fresher than any cache entry. Other dates are
+    served from the Redis cache while it is fresh.
+    """
+    cache_key = f"fx:{date}"
+    if date in FIXTURES_BY_DATE:
+        fixtures = list(FIXTURES_BY_DATE[date])
+    else:
+        cached = await cache_get(cache_key, fixtures_ttl(date))
+        if cached is not None:
+            log.info("Total top league fixtures found: %d", len(cached))
+            return cached
+        fixtures = await request_fixtures(session, f"date={date}")
+
+    if fixtures is not None:
+        # Sort by league importance and limit to 15 fixtures max
+        fixtures.sort(key=lambda x: PRIORITY_RANK.get(x['competition_id'], 999))
+        fixtures = fixtures[:15]
+        await cache_set(cache_key, fixtures)
+    else:
+        # The API failed: a stale cached answer beats no fixtures at all
+        fixtures = await cache_get(cache_key) or []
+
+    log.info("Total top league fixtures found: %d", len(fixtures))
+    return fixtures
+
+async def request_fixtures(session, date_filter):
+    """Get fixtures from football-data.org for TOP leagues only in one multi-competition request
+
+    date_filter is the /matches date query, e.g. "date=2024-05-01" or
+    "dateFrom=2024-05-01&dateTo=2024-05-07". Returns None if the request fails.
+    """
     all_fixtures = []
+    url = f"https://api.football-data.org/v4/matches?{date_filter}&competitions={COMPETITION_FILTER}"
+    log.debug("FootballData REQ: %s", url)
     
-    # Check each top league separately to avoid missing data
-    for league_name, league_id in TOP_LEAGUES.items():
-        url = f"https://api.football-data.org/v4/matches?date={date}&competitions={league_id}"
-        debug_log(f"FootballData REQ: {url}")
-        
-        try:
-            rate_limited_request()  # Rate limiting
-            response = requests.get(url, headers=FOOTBALL_DATA_HEADERS, timeout=15)
-            debug_log(f"FootballData RESP: {response.status_code}")
-            
-            if response.status_code == 200:
-                data = response.json()
-                matches = data.get('matches', [])
-                debug_log(f"Found {len(matches)} fixtures in {league_name}")
-                
-                for fixture in matches:
-                    try:
-                        # Extract fixture data
-                        fixture_data = {
-                            "id": fixture['id'],
-                            "league": fixture['competition']['name'],
-                            "home": fixture['homeTeam']['name'],
-                            "away": fixture['awayTeam']['name'],
-                            "home_id": fixture['homeTeam']['id'],
-                            "away_id": fixture['awayTeam']['id'],
-                            "date": fixture['utcDate'],
-                            "competition_id": fixture['competition']['id']
-                        }
-                        all_fixtures.append(fixture_data)
-                        debug_log(f"Added {league_name} fixture: {fixture_data['home']} vs {fixture_data['away']}")
-                    except KeyError as e:
-                        debug_log(f"Skipping fixture due to missing data: {str(e)}")
-            elif response.status_code == 429:
-                retry_after = int(response.headers.get('Retry-After', 10))
-                debug_log(f"Rate limited. Waiting {retry_after} seconds")
-                time.sleep(retry_after)
-                continue  # Retry this league
-            elif response.status_code == 403:
-                debug_log("API access denied - check token validity")
-                break
-            else:
-                debug_log(f"FootballData Error for {league_name}: {response.status_code}")
-            
-        except Exception as e:
-            debug_log(f"FootballData Exception for {league_name}: {str(e)}")
-    
-    # Sort by league importance and limit to 15 fixtures max
-    priority_leagues = [2021, 2014, 2002, 2019, 2015, 2001, 2000]
-    all_fixtures.sort(key=lambda x: priority_leagues.index(x['competition_id']) 
-                      if x['competition_id'] in priority_leagues else 999)
+    try:
+        status, data = await fetch_json(session, url, FOOTBALL_DATA_LIMITER, headers=FOOTBALL_DATA_HEADERS)
+        log.debug("FootballData RESP: %s", status)
+
+        if status == 200:
+            matches = data.get('matches', [])
+            league_counts = {}
+
+            for fixture in matches:
+                try:
+                    # Extract fixture data
+                    fixture_data = {
+                        "id": fixture['id'],
+                        "league": fixture['competition']['name'],
+                        "home": fixture['homeTeam']['name'],
+                        "away": fixture['awayTeam']['name'],
+                        "home_id": fixture['homeTeam']['id'],
+                        "away_id": fixture['awayTeam']['id'],
+                        "date": fixture['utcDate'],
+                        "competition_id": fixture['competition']['id']
+                    }
+                    all_fixtures.append(fixture_data)
+                    competition_id = fixture_data['competition_id']
+                    league_counts[competition_id] = league_counts.get(competition_id, 0) + 1
+                    log.debug("Added %s fixture: %s vs %s", fixture_data['league'], fixture_data['home'], fixture_data['away'])
+                except KeyError as e:
+                    log.warning("Skipping fixture due to missing data: %s", e)
+
+            for competition_id, count in league_counts.items():
+                log.info("Found %d fixtures in %s", count, ID_TO_NAME.get(competition_id, competition_id))
+            return all_fixtures
+        elif status == 403:
+            log.error("API access denied - check token validity")
+        else:
+            log.error("FootballData Error: %s", status)
+
+    except REQUEST_ERRORS as e:
+        log.error("FootballData Exception: %s", e)
     
-    debug_log(f"Total top league fixtures found: {len(all_fixtures)}")
-    return all_fixtures[:15]  # Limit to 15 most important fixtures
+    return None
+
+def get_team_history(session, team_id, is_home, opponent_id=None):
+    """Get team form, sharing one lookup between every caller with the same arguments
+
+    Returns an awaitable; concurrent fixtures asking for the same team wait on
+    the same in-flight request instead of spending another rate-limit slot.
+    """
+    key = (team_id, is_home, opponent_id)
+    if key not in TEAM_HISTORY_CACHE:
+        TEAM_HISTORY_CACHE[key] = asyncio.ensure_future(
+            fetch_team_history(session, team_id, is_home, opponent_id))
+    return TEAM_HISTORY_CACHE[key]
+
+def get_team_matches(session, team_id):
+    """Get a team's recent finished matches from football-data.org once per run
+
+    The request does not depend on venue or opponent, so H2H and form lookups
+    for the same team share it. Returns an awaitable of fetch_json's (status, data).
+    """
+    if team_id not in TEAM_MATCHES_CACHE:
+        url = f"https://api.football-data.org/v4/teams/{team_id}/matches"
+        today = datetime.now(UK_TZ).date()
+        params = {
+            "status": "FINISHED",
+            "limit": 8,  # Reduced from 10 to save requests
+            "dateFrom": (today - timedelta(days=120)).strftime("%Y-%m-%d"),  # 4 months instead of 6
+            "dateTo": (today - timedelta(days=1)).strftime("%Y-%m-%d")
+        }
+        TEAM_MATCHES_CACHE[team_id] = asyncio.ensure_future(
+            fetch_json(session, url, FOOTBALL_DATA_LIMITER,
+                       headers=FOOTBALL_DATA_HEADERS, params=params, timeout=10))
+    return TEAM_MATCHES_CACHE[team_id]
+
+async def fetch_team_history(session, team_id, is_home, opponent_id=None):
+    """Get team form, served from the Redis cache while it is fresh"""
+    cache_key = f"th:{team_id}:{int(is_home)}:{opponent_id}"
+    history = await cache_get(cache_key, TEAM_HISTORY_TTL)
+    if history is not None:
+        return history
+
+    history = await request_team_history(session, team_id, is_home, opponent_id)
+    if history is not None:
+        await cache_set(cache_key, history)
+        return history
+
+    # Every source failed: a stale cached answer beats no data at all
+    return await cache_get(cache_key) or []
 
-def get_team_history(team_id, is_home, opponent_id=None):
-    """Get team form with flexible data source and rate limiting"""
+async def request_team_history(session, team_id, is_home, opponent_id=None):
+    """Get team form with flexible data source and rate limiting
+
+    Returns None if no source could be reached.
+    """
     # First try football-data.org
-    url = f"https://api.football-data.org/v4/teams/{team_id}/matches"
-    params = {
-        "status": "FINISHED",
-        "limit": 8,  # Reduced from 10 to save requests
-        "dateFrom": (datetime.now() - timedelta(days=120)).strftime("%Y-%m-%d"),  # 4 months instead of 6
-        "dateTo": (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
-    }
-    
     try:
-        rate_limited_request()  # Rate limiting
-        response = requests.get(url, headers=FOOTBALL_DATA_HEADERS, params=params, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
+        status, data = await get_team_matches(session, team_id)
+        if status == 200:
             matches = data.get('matches', [])
             
             # Filter for home/away matches
-            venue_matches = []
-            for match in matches:
-                if is_home and match['homeTeam']['id'] == team_id:
-                    venue_matches.append(match)
-                elif not is_home and match['awayTeam']['id'] == team_id:
-                    venue_matches.append(match)
+            team_side, opponent_side = ('homeTeam', 'awayTeam') if is_home else ('awayTeam', 'homeTeam')
+            venue_matches = [m for m in matches if m[team_side]['id'] == team_id]
             
-            # If we have opponent-specific request, filter H2H
+            # If we have opponent-specific request, filter H2H (the opponent can only be on the other side)
             if opponent_id:
-                h2h_matches = [m for m in venue_matches 
-                              if opponent_id in (m['homeTeam']['id'], m['awayTeam']['id'])]
+                h2h_matches = [m for m in venue_matches if m[opponent_side]['id'] == opponent_id]
                 return h2h_matches[:5]  # Return last 5 H2H
             
             return venue_matches[:5]  # Return last 5 venue-specific matches
-        elif response.status_code == 429:
-            debug_log("Rate limited in team history request")
-            return []
-    except:
-        pass
+        elif status == 429:
+            log.warning("Rate limited in team history request")
+            return None
+    except REQUEST_ERRORS as e:
+        log.warning("FootballData team history error for team %s: %s", team_id, e)
     
     # Fallback to RapidAPI if football-data fails
-    debug_log(f"Using RapidAPI fallback for team {team_id}")
+    log.info("Using RapidAPI fallback for team %s", team_id)
     url = "https://api-football-v1.p.rapidapi.com/v3/fixtures"
     venue = "home" if is_home else "away"
     params = {"team": team_id, "last": 5, "status": "finished", "venue": venue}
     
     try:
-        rate_limited_request()  # Rate limiting for RapidAPI too
-        response = requests.get(url, headers=HEADERS, params=params, verify=False, timeout=8)
-        if response.status_code == 200:
-            data = response.json()
+        status, data = await fetch_json(session, url, RAPIDAPI_LIMITER,
+                                        headers=HEADERS, params=params, timeout=8, ssl=False)
+        if status == 200:
             return data.get('response', [])
-    except:
-        pass
+    except REQUEST_ERRORS as e:
+        log.warning("RapidAPI team history error for team %s: %s", team_id, e)
     
-    return []
+    return None
 
-def analyze_fixture(fixture):
+def score_arrays(matches):
+    """Return (home_ids, away_ids, home_goals, away_goals) arrays for a list of matches"""
+    rows = [(m['homeTeam']['id'], m['awayTeam']['id'],
+             m['score']['fullTime']['home'], m['score']['fullTime']['away']) for m in matches]
+    return np.array(rows, dtype=np.int64).reshape(-1, 4).T
+
+async def analyze_fixture(session, fixture):
     """Improved prediction logic with flexible thresholds including BTS and Over/Under"""
     predictions = []
+    home_id = fixture['home_id']
+    away_id = fixture['away_id']
     
-    # Get required data with football-data first
-    h2h_matches = get_team_history(fixture['home_id'], True, fixture['away_id'])
-    home_form = get_team_history(fixture['home_id'], True)
-    away_form = get_team_history(fixture['away_id'], False)
+    # Get required data with football-data first; the three lookups are independent
+    h2h_matches, home_form, away_form = await asyncio.gather(
+        get_team_history(session, home_id, True, away_id),
+        get_team_history(session, home_id, True),
+        get_team_history(session, away_id, False)
+    )
     
-    debug_log(f"Found: {len(h2h_matches)} H2H, {len(home_form)} home form, {len(away_form)} away form")
+    log.debug("Found: %d H2H, %d home form, %d away form", len(h2h_matches), len(home_form), len(away_form))
     
+    # Each rule extracts the arrays it reads inside its own guard, so a list
+    # that is too short for any rule is never parsed
     # Rule 1: H2H Dominance (W1/W2) - require at least 3 matches
     if len(h2h_matches) >= 3:
-        home_wins = 0
-        away_wins = 0
-        
-        for match in h2h_matches:
-            if match['homeTeam']['id'] == fixture['home_id']:
-                if match['score']['fullTime']['home'] > match['score']['fullTime']['away']:
-                    home_wins += 1
-                elif match['score']['fullTime']['home'] < match['score']['fullTime']['away']:
-                    away_wins += 1
+        h2h_home_ids, _, h2h_home_goals, h2h_away_goals = score_arrays(h2h_matches)
+        was_home_team = h2h_home_ids == home_id
+        home_wins = int(np.sum(was_home_team & (h2h_home_goals > h2h_away_goals)))
+        away_wins = int(np.sum(was_home_team & (h2h_home_goals < h2h_away_goals)))
         
         if home_wins >= 3:
             predictions.append(f"W1 (H2H: {home_wins}/{len(h2h_matches)} wins)")
@@ -212,153 +405,113 @@ def analyze_fixture(fixture):
     
     # Rule 2: Home/Away Form (W1/W2) - require at least 3 matches
     if len(home_form) >= 3:
-        home_wins = sum(1 for m in home_form 
-                      if m['homeTeam']['id'] == fixture['home_id'] and 
-                         m['score']['fullTime']['home'] > m['score']['fullTime']['away'])
+        home_home_ids, _, home_home_goals, home_away_goals = score_arrays(home_form)
+        home_wins = int(np.sum((home_home_ids == home_id) & (home_home_goals > home_away_goals)))
         
         if home_wins >= 3:
             predictions.append(f"W1 (Home Form: {home_wins}/{len(home_form)} wins)")
     
     if len(away_form) >= 3:
-        away_wins = sum(1 for m in away_form 
-                      if m['awayTeam']['id'] == fixture['away_id'] and 
-                         m['score']['fullTime']['away'] > m['score']['fullTime']['home'])
+        _, away_away_ids, away_home_goals, away_away_goals = score_arrays(away_form)
+        away_wins = int(np.sum((away_away_ids == away_id) & (away_away_goals > away_home_goals)))
         
         if away_wins >= 3:
             predictions.append(f"W2 (Away Form: {away_wins}/{len(away_form)} wins)")
     
-    # Rule 3: Both Teams to Score (BTS) - based on home/away form and H2H
+    # Rules 3 and 4 share the same sample: the home team's last 3 home matches,
+    # the away team's last 3 away matches and the last 2 H2H matches
     if len(home_form) >= 3 and len(away_form) >= 3 and len(h2h_matches) >= 2:
-        # Check home team's last 3 home matches for BTS
-        home_bts_count = 0
-        for match in home_form[:3]:  # Last 3 home matches
-            if match['score']['fullTime']['home'] > 0 and match['score']['fullTime']['away'] > 0:
-                home_bts_count += 1
-        
-        # Check away team's last 3 away matches for BTS
-        away_bts_count = 0
-        for match in away_form[:3]:  # Last 3 away matches
-            if match['score']['fullTime']['home'] > 0 and match['score']['fullTime']['away'] > 0:
-                away_bts_count += 1
-        
-        # Check last 2 H2H matches for BTS
-        h2h_bts_count = 0
-        for match in h2h_matches[:2]:  # Last 2 H2H matches
-            if match['score']['fullTime']['home'] > 0 and match['score']['fullTime']['away'] > 0:
-                h2h_bts_count += 1
+        _, _, home_home_goals, home_away_goals = score_arrays(home_form[:3])
+        _, _, away_home_goals, away_away_goals = score_arrays(away_form[:3])
+        _, _, h2h_home_goals, h2h_away_goals = score_arrays(h2h_matches[:2])
+
+        # Rule 3: Both Teams to Score (BTS)
+        home_bts_count = int(np.sum((home_home_goals > 0) & (home_away_goals > 0)))
+        away_bts_count = int(np.sum((away_home_goals > 0) & (away_away_goals > 0)))
+        h2h_bts_count = int(np.sum((h2h_home_goals > 0) & (h2h_away_goals > 0)))
         
         if home_bts_count >= 2 and away_bts_count >= 2 and h2h_bts_count >= 1:
             predictions.append(f"BTS (Home: {home_bts_count}/3, Away: {away_bts_count}/3, H2H: {h2h_bts_count}/2)")
     
-    # Rule 4: Over 2.5 Goals - based on home/away form and H2H
-    if len(home_form) >= 3 and len(away_form) >= 3 and len(h2h_matches) >= 2:
-        # Check home team's last 3 home matches for Over 2.5
-        home_over_count = 0
-        for match in home_form[:3]:
-            if match['score']['fullTime']['home'] + match['score']['fullTime']['away'] > 2.5:
-                home_over_count += 1
-        
-        # Check away team's last 3 away matches for Over 2.5
-        away_over_count = 0
-        for match in away_form[:3]:
-            if match['score']['fullTime']['home'] + match['score']['fullTime']['away'] > 2.5:
-                away_over_count += 1
-        
-        # Check last 2 H2H matches for Over 2.5
-        h2h_over_count = 0
-        for match in h2h_matches[:2]:
-            if match['score']['fullTime']['home'] + match['score']['fullTime']['away'] > 2.5:
-                h2h_over_count += 1
+        # Rule 4: Over 2.5 Goals (goals are integers, so more than 2.5 means at least 3)
+        home_over_count = int(np.sum(home_home_goals + home_away_goals >= 3))
+        away_over_count = int(np.sum(away_home_goals + away_away_goals >= 3))
+        h2h_over_count = int(np.sum(h2h_home_goals + h2h_away_goals >= 3))
         
         if home_over_count >= 2 and away_over_count >= 2 and h2h_over_count >= 1:
             predictions.append(f"Over 2.5 (Home: {home_over_count}/3, Away: {away_over_count}/3, H2H: {h2h_over_count}/2)")
     
     return predictions
 
-def get_upcoming_match_dates(days=7):
-    """Get a list of dates with matches in the next X days"""
-    uk_tz = pytz.timezone('Europe/London')
-    today = datetime.now(uk_tz)
-    match_dates = []
-    
-    for i in range(days):
-        check_date = today + timedelta(days=i)
-        formatted_date = check_date.strftime("%Y-%m-%d")
-        
-        # Quick check if any top leagues have matches on this date
-        for league_id in TOP_LEAGUES.values():
-            url = f"https://api.football-data.org/v4/matches?date={formatted_date}&competitions={league_id}"
-            try:
-                rate_limited_request()
-                response = requests.get(url, headers=FOOTBALL_DATA_HEADERS, timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get('matches') and len(data['matches']) > 0:
-                        match_dates.append(formatted_date)
-                        debug_log(f"Found matches on {formatted_date}")
-                        break
-                elif response.status_code == 429:
-                    debug_log("Rate limited during date checking")
-                    time.sleep(10)
-            except:
-                continue
-                
-        time.sleep(1)  # Small delay between date checks
+async def get_upcoming_match_dates(session, days=7):
+    """Get a list of dates with matches in the next X days from a single date-range request"""
+    today = datetime.now(UK_TZ).date()
+    date_to = today + timedelta(days=days - 1)
+
+    fixtures = await request_fixtures(session, f"dateFrom={today}&dateTo={date_to}")
+    for fixture in fixtures or []:
+        FIXTURES_BY_DATE.setdefault(fixture['date'][:10], []).append(fixture)
+
+    match_dates = sorted(FIXTURES_BY_DATE)
+    for match_date in match_dates:
+        log.info("Found matches on %s", match_date)
     
     return match_dates if match_dates else [today.strftime("%Y-%m-%d")]
 
-def send_telegram_messages_by_date(date_signals, total_signals):
-    """Send Telegram messages split by date to avoid message length limits"""
-    uk_tz = pytz.timezone('Europe/London')
-    now_uk = datetime.now(uk_tz)
+async def send_telegram_messages_by_date(session, date_signals, total_signals):
+    """Send the report packed into as few Telegram messages as the length limit allows"""
+    now_uk = datetime.now(UK_TZ)
     
-    # Send header message
     header_message = (
         f"⚽ <b>TOP LEAGUE PREDICTION SIGNALS</b> ⚽\n\n"
         f"<b>Report Generated:</b> {now_uk.strftime('%Y-%m-%d %H:%M %Z')}\n"
         f"<b>Total Signals:</b> {total_signals}\n\n"
-        "📊 <b>Breakdown by Date:</b>"
+        "📊 <b>Breakdown by Date:</b>\n"
     )
-    send_telegram(header_message)
-    time.sleep(1)
+    messages = [header_message]
     
-    # Send signals for each date in separate messages
     for date_data in date_signals:
-        date_message = (
+        date_header = (
             f"\n📅 <b>Date: {date_data['date']}</b>\n"
             f"<b>Signals: {date_data['count']}/{date_data['total_fixtures']}</b>\n\n"
         )
         
-        # Add each match signal
+        # Add each match signal, keeping the date header with its first signal
         for i, signal in enumerate(date_data['signals']):
-            date_message += f"{signal}\n\n"
+            block = f"{signal}\n\n"
+            if i == 0:
+                block = date_header + block
             
-            # Check if we're approaching Telegram's 4096 character limit
-            if len(date_message) > 3500 and i < len(date_data['signals']) - 1:
-                # Send current batch and start a new message for the same date
-                send_telegram(date_message)
-                time.sleep(1)
-                date_message = f"📅 <b>Date: {date_data['date']} (cont.)</b>\n\n"
+            # Start a new message before reaching Telegram's 4096 character limit
+            if len(messages[-1]) + len(block) <= TELEGRAM_MESSAGE_LIMIT:
+                messages[-1] += block
+            elif i == 0:
+                messages.append(block)
+            else:
+                messages.append(f"📅 <b>Date: {date_data['date']} (cont.)</b>\n\n" + block)
         
-        # Send the completed date message
-        send_telegram(date_message)
-        time.sleep(1)
-    
-    # Send footer with disclaimer
+    # Footer with disclaimer
     footer_message = (
         "\n⚠️ <b>Disclaimer:</b> Predictions based on historical data analysis. "
         "Past performance doesn't guarantee future results. "
         "Always gamble responsibly."
     )
-    send_telegram(footer_message)
+    if len(messages[-1]) + len(footer_message) <= TELEGRAM_MESSAGE_LIMIT:
+        messages[-1] += footer_message
+    else:
+        messages.append(footer_message)
+
+    # Sent in order; flood control is handled by fetch_json's 429 retries
+    for message in messages:
+        await send_telegram(session, message)
 
 def save_predictions(predictions):
     """Save predictions to a JSON file for future result checking"""
     try:
         # Load existing predictions if any
         if os.path.exists(PREDICTIONS_FILE):
-            with open(PREDICTIONS_FILE, 'r') as f:
-                existing_data = json.load(f)
+            with open(PREDICTIONS_FILE, 'rb') as f:
+                existing_data = orjson.loads(f.read())
         else:
             existing_data = []
         
@@ -370,23 +523,37 @@ def save_predictions(predictions):
         with open(PREDICTIONS_FILE, 'w') as f:
             json.dump(existing_data, f, indent=4)
         
-        debug_log(f"Saved {len(predictions)} predictions to {PREDICTIONS_FILE}")
+        log.info("Saved %d predictions to %s", len(predictions), PREDICTIONS_FILE)
     except Exception as e:
-        debug_log(f"Error saving predictions: {str(e)}")
+        log.error("Error saving predictions: %s", e)
+
+async def get_match_result(session, match_id):
+    """Get a finished match from football-data.org, or None if unavailable"""
+    try:
+        url = f"https://api.football-data.org/v4/matches/{match_id}"
+        status, data = await fetch_json(session, url, FOOTBALL_DATA_LIMITER,
+                                        headers=FOOTBALL_DATA_HEADERS, timeout=10)
+        if status == 200:
+            match = data.get('match', {})
+            if match.get('status') == 'FINISHED':
+                return match
+    except REQUEST_ERRORS + (AttributeError, TypeError) as e:
+        # Also skip odd payloads (e.g. a non-dict body) so one match cannot sink the whole check
+        log.error("Error checking match %s: %s", match_id, e)
+    return None
 
-def check_previous_predictions():
+async def check_previous_predictions(session):
     """Check results of previous predictions and calculate win rate"""
     try:
         if not os.path.exists(PREDICTIONS_FILE):
-            debug_log("No previous predictions file found.")
+            log.info("No previous predictions file found.")
             return None
         
-        with open(PREDICTIONS_FILE, 'r') as f:
-            predictions = json.load(f)
+        with open(PREDICTIONS_FILE, 'rb') as f:
+            predictions = orjson.loads(f.read())
         
         # Filter predictions for matches that have been played (match date is past)
-        uk_tz = pytz.timezone('Europe/London')
-        now_uk = datetime.now(uk_tz)
+        now_uk = datetime.now(UK_TZ)
         checked_predictions = []
         results = {
             'W1': {'correct': 0, 'total': 0},
@@ -395,45 +562,42 @@ def check_previous_predictions():
             'Over 2.5': {'correct': 0, 'total': 0}
         }
         
-        for pred in predictions:
-            match_date = datetime.fromisoformat(pred['match_date'].replace('Z', '+00:00')).astimezone(uk_tz)
-            if match_date < now_uk:
-                # Match has been played, check result
-                try:
-                    # Get match result from API
-                    url = f"https://api.football-data.org/v4/matches/{pred['match_id']}"
-                    rate_limited_request()
-                    response = requests.get(url, headers=FOOTBALL_DATA_HEADERS, timeout=10)
-                    if response.status_code == 200:
-                        data = response.json()
-                        match = data.get('match', {})
-                        if match.get('status') == 'FINISHED':
-                            home_score = match['score']['fullTime']['home']
-                            away_score = match['score']['fullTime']['away']
+        played = [pred for pred in predictions
+                  if ciso8601.parse_datetime(pred['match_date']).astimezone(UK_TZ) < now_uk]
                             
-                            # Check each prediction type
-                            for prediction_type in pred['predictions']:
-                                if prediction_type.startswith('W1'):
-                                    results['W1']['total'] += 1
-                                    if home_score > away_score:
-                                        results['W1']['correct'] += 1
-                                elif prediction_type.startswith('W2'):
-                                    results['W2']['total'] += 1
-                                    if away_score > home_score:
-                                        results['W2']['correct'] += 1
-                                elif prediction_type.startswith('BTS'):
-                                    results['BTS']['total'] += 1
-                                    if home_score > 0 and away_score > 0:
-                                        results['BTS']['correct'] += 1
-                                elif prediction_type.startswith('Over 2.5'):
-                                    results['Over 2.5']['total'] += 1
-                                    if home_score + away_score > 2.5:
-                                        results['Over 2.5']['correct'] += 1
+        # Match has been played, check results concurrently
+        matches = await asyncio.gather(*[get_match_result(session, pred['match_id']) for pred in played])
                             
-                            # Mark as checked
-                            checked_predictions.append(pred)
-                except Exception as e:
-                    debug_log(f"Error checking match {pred['match_id']}: {str(e)}")
+        for pred, match in zip(played, matches):
+            if match is None:
+                continue
+            try:
+                home_score = match['score']['fullTime']['home']
+                away_score = match['score']['fullTime']['away']
+
+                # Check each prediction type
+                for prediction_type in pred['predictions']:
+                    if prediction_type.startswith('W1'):
+                        results['W1']['total'] += 1
+                        if home_score > away_score:
+                            results['W1']['correct'] += 1
+                    elif prediction_type.startswith('W2'):
+                        results['W2']['total'] += 1
+                        if away_score > home_score:
+                            results['W2']['correct'] += 1
+                    elif prediction_type.startswith('BTS'):
+                        results['BTS']['total'] += 1
+                        if home_score > 0 and away_score > 0:
+                            results['BTS']['correct'] += 1
+                    elif prediction_type.startswith('Over 2.5'):
+                        results['Over 2.5']['total'] += 1
+                        if home_score + away_score > 2.5:
+                            results['Over 2.5']['correct'] += 1
+
+                # Mark as checked
+                checked_predictions.append(pred)
+            except Exception as e:
+                log.error("Error checking match %s: %s", pred['match_id'], e)
         
         # Remove checked predictions from file
         unchecked_predictions = [p for p in predictions if p not in checked_predictions]
@@ -450,101 +614,124 @@ def check_previous_predictions():
         
         return win_rates
     except Exception as e:
-        debug_log(f"Error checking previous predictions: {str(e)}")
+        log.error("Error checking previous predictions: %s", e)
         return None
 
-def main():
-    # Check previous predictions and log win rates
-    win_rates = check_previous_predictions()
-    if win_rates:
-        debug_log(f"Previous prediction win rates: {win_rates}")
-        # Send win rates to Telegram if desired
-        win_message = "📊 <b>Prediction Win Rates (Last Run):</b>\n"
-        for key, value in win_rates.items():
-            win_message += f"{key}: {value}\n"
-        send_telegram(win_message)
+async def scan_fixture(session, fixture, index, total):
+    """Analyze one fixture, returning (signal message, prediction record) or None"""
+    log.info("Analyzing %d/%d: %s vs %s", index, total, fixture['home'], fixture['away'])
+    try:
+        predictions = await analyze_fixture(session, fixture)
+        if predictions:
+            match_time = ciso8601.parse_datetime(fixture['date']).astimezone(UK_TZ)
+            match_info = (
+                f"<b>🏟 {fixture['home']} vs {fixture['away']}</b>\n"
+                f"<b>League:</b> {fixture['league']}\n"
+                f"<b>Time:</b> {match_time.strftime('%H:%M %Z')}\n"
+                f"<b>Predictions:</b>\n" + "\n".join([f"• {pred}" for pred in predictions])
+            )
+            log.info("Signal found: %s", predictions)
     
-    # Get current UK time
-    uk_tz = pytz.timezone('Europe/London')
-    now_uk = datetime.now(uk_tz)
+            # Save prediction for future checking
+            prediction_record = {
+                'match_id': fixture['id'],
+                'match_date': fixture['date'],
+                'home': fixture['home'],
+                'away': fixture['away'],
+                'predictions': predictions
+            }
+            return match_info, prediction_record
+        log.debug("No predictions met criteria")
+    except Exception as e:
+        log.error("Analysis error: %s", e)
+    return None
     
-    # Get upcoming match dates (next 7 days)
-    match_dates = get_upcoming_match_dates(7)
-    debug_log(f"Found matches on these dates: {match_dates}")
+async def scan_date(session, match_date):
+    """Scan one date's fixtures, returning (date signals, prediction records) or None"""
+    log.info("======== SCANNING DATE: %s ========", match_date)
+
+    fixtures = await get_fixtures(session, match_date)
+
+    if not fixtures:
+        log.info("No fixtures found for %s", match_date)
+        return None
+
+    log.info("Processing %d top league fixtures for %s", len(fixtures), match_date)
+
+    # Fixtures are analyzed concurrently; API pacing is left to the limiters
+    results = await asyncio.gather(*[
+        scan_fixture(session, fixture, i + 1, len(fixtures))
+        for i, fixture in enumerate(fixtures)
+    ])
+    results = [result for result in results if result]
+    if not results:
+        return None
+
+    signals = [match_info for match_info, _ in results]
+    date_data = {
+        "date": match_date,
+        "signals": signals,
+        "count": len(signals),
+        "total_fixtures": len(fixtures)
+    }
+    return date_data, [record for _, record in results]
+
+async def main():
+    # Start every run from fresh listings; memoized lookups hold tasks bound to the previous event loop
+    TEAM_HISTORY_CACHE.clear()
+    TEAM_MATCHES_CACHE.clear()
+    FIXTURES_BY_DATE.clear()
+
+    connector = aiohttp.TCPConnector(limit_per_host=64, keepalive_timeout=KEEPALIVE_TIMEOUT)
+    try:
+        async with aiohttp.ClientSession(connector=connector) as session:
+            # Check previous predictions and log win rates
+            win_rates = await check_previous_predictions(session)
+            if win_rates:
+                log.info("Previous prediction win rates: %s", win_rates)
+                # Send win rates to Telegram if desired
+                win_message = "📊 <b>Prediction Win Rates (Last Run):</b>\n"
+                for key, value in win_rates.items():
+                    win_message += f"{key}: {value}\n"
+                await send_telegram(session, win_message)
     
-    date_signals = []
-    total_signals = 0
-    all_predictions_to_save = []  # To save predictions for future checking
+            # Get current UK time
+            now_uk = datetime.now(UK_TZ)
     
-    for match_date in match_dates:
-        debug_log(f"======== SCANNING DATE: {match_date} ========")
-        
-        fixtures = get_fixtures(match_date)
-        
-        if not fixtures:
-            debug_log(f"No fixtures found for {match_date}")
-            continue
-        
-        debug_log(f"Processing {len(fixtures)} top league fixtures for {match_date}")
-        signals = []
-        
-        for i, fixture in enumerate(fixtures):
-            debug_log(f"Analyzing {i+1}/{len(fixtures)}: {fixture['home']} vs {fixture['away']}")
-            try:
-                predictions = analyze_fixture(fixture)
-                if predictions:
-                    match_time = datetime.fromisoformat(fixture['date'].replace('Z', '+00:00')).astimezone(uk_tz)
-                    match_info = (
-                        f"<b>🏟 {fixture['home']} vs {fixture['away']}</b>\n"
-                        f"<b>League:</b> {fixture['league']}\n"
-                        f"<b>Time:</b> {match_time.strftime('%H:%M %Z')}\n"
-                        f"<b>Predictions:</b>\n" + "\n".join([f"• {pred}" for pred in predictions])
-                    )
-                    signals.append(match_info)
-                    debug_log(f"Signal found: {predictions}")
-                    
-                    # Save prediction for future checking
-                    prediction_record = {
-                        'match_id': fixture['id'],
-                        'match_date': fixture['date'],
-                        'home': fixture['home'],
-                        'away': fixture['away'],
-                        'predictions': predictions
-                    }
-                    all_predictions_to_save.append(prediction_record)
-                else:
-                    debug_log("No predictions met criteria")
-            except Exception as e:
-                debug_log(f"Analysis error: {str(e)}")
-            time.sleep(1.5)  # Rate limiting between fixtures
+            # Get upcoming match dates (next 7 days)
+            match_dates = await get_upcoming_match_dates(session, 7)
+            log.info("Found matches on these dates: %s", match_dates)
         
-        if signals:
-            date_signals.append({
-                "date": match_date,
-                "signals": signals,
-                "count": len(signals),
-                "total_fixtures": len(fixtures)
-            })
-            total_signals += len(signals)
+            # Dates are scanned concurrently; results come back in date order
+            date_results = await asyncio.gather(*[scan_date(session, match_date) for match_date in match_dates])
+            date_results = [result for result in date_results if result]
+            date_signals = [date_data for date_data, _ in date_results]
+            total_signals = sum(date_data['count'] for date_data in date_signals)
+            # To save predictions for future checking
+            all_predictions_to_save = [record for _, records in date_results for record in records]
     
-    # Save predictions to file
-    if all_predictions_to_save:
-        save_predictions(all_predictions_to_save)
+            # Save predictions to file
+            if all_predictions_to_save:
+                save_predictions(all_predictions_to_save)
     
-    # Send consolidated report split by date
-    if date_signals:
-        send_telegram_messages_by_date(date_signals, total_signals)
-        debug_log(f"Sent {total_signals} signals to Telegram")
-    else:
-        send_telegram(
-            f"ℹ️ <b>No Prediction Signals Found</b>\n\n"
-            f"<b>Dates Checked:</b> {', '.join(match_dates)}\n"
-            f"<b>Time:</b> {now_uk.strftime('%H:%M %Z')}\n\n"
-            "No top league matches met the prediction criteria."
-        )
-        debug_log("No signals found")
-    
-    debug_log("======== SCAN COMPLETED ========")
+            # Send consolidated report split by date
+            if date_signals:
+                await send_telegram_messages_by_date(session, date_signals, total_signals)
+                log.info("Sent %d signals to Telegram", total_signals)
+            else:
+                await send_telegram(
+                    session,
+                    f"ℹ️ <b>No Prediction Signals Found</b>\n\n"
+                    f"<b>Dates Checked:</b> {', '.join(match_dates)}\n"
+                    f"<b>Time:</b> {now_uk.strftime('%H:%M %Z')}\n\n"
+                    "No top league matches met the prediction criteria."
+                )
+                log.info("No signals found")
+
+            log.info("======== SCAN COMPLETED ========")
+    finally:
+        if REDIS is not None:
+            await REDIS.aclose()
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())